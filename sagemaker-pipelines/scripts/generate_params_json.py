@@ -6,11 +6,17 @@ This script creates parameter files for pipeline execution with dynamic values
 
 import json
 import argparse
-from datetime import datetime
-from typing import Dict, Any
-import boto3
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # Fall back to the stdlib encoder when orjson isn't installed
+    orjson = None
+
 
 def parse_arguments() -> argparse.Namespace:
     """Parse command line arguments"""
@@ -71,22 +77,52 @@ def parse_arguments() -> argparse.Namespace:
     return parser.parse_args()
 
 
+@functools.lru_cache(maxsize=None)
+def _sts_client(region: Optional[str] = None):
+    """Create the STS client once and reuse it"""
+    import boto3
+
+    return boto3.client("sts", region_name=region)
+
+
+@functools.lru_cache(maxsize=1)
 def get_aws_account_id() -> str:
     """Get current AWS account ID"""
     try:
-        sts = boto3.client("sts")
+        sts = _sts_client()
         return sts.get_caller_identity()["Account"]
     except Exception as e:
         print(f"Warning: Could not get AWS account ID: {e}")
         return "123456789012"  # Default placeholder
 
 
+def _make_tags(
+    project: str,
+    environment: str,
+    pipeline_type: str,
+    managed_by: str,
+    timestamp: Optional[str] = None,
+) -> List[Dict[str, str]]:
+    """Build the standard resource tags, adding a Timestamp tag when given"""
+    tags = [
+        {"Key": "Project", "Value": project},
+        {"Key": "Environment", "Value": environment},
+        {"Key": "Type", "Value": pipeline_type},
+        {"Key": "ManagedBy", "Value": managed_by},
+    ]
+    if timestamp:
+        tags.append({"Key": "Timestamp", "Value": timestamp})
+    return tags
+
+
 def generate_training_parameters(
-    args: argparse.Namespace, account_id: str
-) -> Dict[str, Any]:
-    """Generate parameters for training pipeline"""
-    timestamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    args: argparse.Namespace, account_id: str, timestamp: str
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Generate parameters for training pipeline
 
+    Returns the full parameter dict and the subset of top-level scalar values
+    used as the EventBridge PipelineParameterList.
+    """
     # Default S3 paths if not provided
     bucket_name = f"mlflow-{args.environment}-mlflow-artifacts-zali-{args.environment}"
     training_data_path = (
@@ -94,11 +130,20 @@ def generate_training_parameters(
     )
     model_output_path = args.model_output_path or f"s3://{bucket_name}/models/"
 
+    # Prefixes shared by the job name, role and image URIs
+    name_prefix = f"{args.project_name}-{args.environment}"
+    ecr_host = f"{account_id}.dkr.ecr.{args.aws_region}.amazonaws.com"
+    role_base = f"arn:aws:iam::{account_id}:role/{name_prefix}"
+
+    scalar_params = {
+        "TrainingJobName": f"{name_prefix}-training-{timestamp}",
+        "RoleArn": f"{role_base}-training-role",
+    }
+
     parameters = {
-        "TrainingJobName": f"{args.project_name}-{args.environment}-training-{timestamp}",
-        "RoleArn": f"arn:aws:iam::{account_id}:role/{args.project_name}-{args.environment}-training-role",
+        **scalar_params,
         "AlgorithmSpecification": {
-            "TrainingImage": f"{account_id}.dkr.ecr.{args.aws_region}.amazonaws.com/{args.project_name}-{args.environment}-training:latest",
+            "TrainingImage": f"{ecr_host}/{name_prefix}-training:latest",
             "TrainingInputMode": "File",
         },
         "InputDataConfig": [
@@ -136,46 +181,54 @@ def generate_training_parameters(
             "ENVIRONMENT": args.environment,
             "OWNER": "zali",
         },
-        "Tags": [
-            {"Key": "Project", "Value": args.project_name},
-            {"Key": "Environment", "Value": args.environment},
-            {"Key": "Type", "Value": "training"},
-            {"Key": "ManagedBy", "Value": "eventbridge"},
-            {"Key": "Timestamp", "Value": timestamp},
-        ],
+        "Tags": _make_tags(
+            args.project_name, args.environment, "training", "eventbridge", timestamp
+        ),
     }
 
-    return parameters
+    return parameters, scalar_params
 
 
 def generate_inference_parameters(
-    args: argparse.Namespace, account_id: str
-) -> Dict[str, Any]:
-    """Generate parameters for inference pipeline"""
-    timestamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    args: argparse.Namespace, account_id: str, timestamp: str
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Generate parameters for inference pipeline
 
+    Returns the full parameter dict and the subset of top-level scalar values
+    used as the EventBridge PipelineParameterList.
+    """
     # Default S3 paths if not provided
     bucket_name = f"mlflow-{args.environment}-mlflow-artifacts-zali-{args.environment}"
     inference_input_path = (
         args.inference_input_path or f"s3://{bucket_name}/inference/input/"
     )
     inference_output_path = f"s3://{bucket_name}/inference/output/"
+    # Container path the input prefix is mounted at; passed to the app as
+    # SM_PROCESSING_INPUT_DIR so both sides agree
+    inference_input_dir = "/opt/ml/input/data/input"
 
     # Default Kafka topic if not provided
     kafka_topic = args.kafka_topic or f"ml-predictions-{args.environment}"
 
+    # Prefixes shared by the job name, role and image URIs
+    name_prefix = f"{args.project_name}-{args.environment}"
+    ecr_host = f"{account_id}.dkr.ecr.{args.aws_region}.amazonaws.com"
+    role_base = f"arn:aws:iam::{account_id}:role/{name_prefix}"
+
+    scalar_params = {
+        "ProcessingJobName": f"{name_prefix}-inference-{timestamp}",
+        "RoleArn": f"{role_base}-processing-role",
+    }
+
     parameters = {
-        "ProcessingJobName": f"{args.project_name}-{args.environment}-inference-{timestamp}",
-        "RoleArn": f"arn:aws:iam::{account_id}:role/{args.project_name}-{args.environment}-processing-role",
-        "AppSpecification": {
-            "ImageUri": f"{account_id}.dkr.ecr.{args.aws_region}.amazonaws.com/{args.project_name}-{args.environment}-inference:latest"
-        },
+        **scalar_params,
+        "AppSpecification": {"ImageUri": f"{ecr_host}/{name_prefix}-inference:latest"},
         "ProcessingInputs": [
             {
                 "InputName": "input",
                 "S3Input": {
                     "S3Uri": inference_input_path,
-                    "LocalPath": "/opt/ml/input/data/input",
+                    "LocalPath": inference_input_dir,
                     "S3DataType": "S3Prefix",
                     "S3InputMode": "File",
                 },
@@ -211,34 +264,37 @@ def generate_inference_parameters(
             "MODEL_NAME": f"{args.environment}-classifier",
             "MODEL_STAGE": "Production",
             "BATCH_SIZE": "1000",
+            "SM_PROCESSING_INPUT_DIR": inference_input_dir,
+            "S3_OUTPUT_URI": inference_output_path,
             "AWS_DEFAULT_REGION": args.aws_region,
             "ENVIRONMENT": args.environment,
         },
-        "Tags": [
-            {"Key": "Project", "Value": args.project_name},
-            {"Key": "Environment", "Value": args.environment},
-            {"Key": "Type", "Value": "inference"},
-            {"Key": "ManagedBy", "Value": "eventbridge"},
-            {"Key": "Timestamp", "Value": timestamp},
-        ],
+        "Tags": _make_tags(
+            args.project_name, args.environment, "inference", "eventbridge", timestamp
+        ),
     }
 
-    return parameters
+    return parameters, scalar_params
+
+
+def dump_json(data: Dict[str, Any]) -> bytes:
+    """Serialize data as indented JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2).encode("utf-8")
 
 
 def save_parameters(parameters: Dict[str, Any], output_file: str) -> None:
     """Save parameters to JSON file"""
     output_path = Path(output_file)
     output_path.parent.mkdir(parents=True, exist_ok=True)
-
-    with open(output_path, "w") as f:
-        json.dump(parameters, f, indent=2, default=str)
+    output_path.write_bytes(dump_json(parameters))
 
     print(f"Parameters saved to: {output_file}")
 
 
 def generate_eventbridge_rule_json(
-    args: argparse.Namespace, parameters: Dict[str, Any]
+    args: argparse.Namespace, scalar_params: Dict[str, str], account_id: str
 ) -> Dict[str, Any]:
     """Generate EventBridge rule configuration"""
     schedule_expression = (
@@ -253,23 +309,14 @@ def generate_eventbridge_rule_json(
         "Targets": [
             {
                 "Id": "1",
-                "Arn": f"arn:aws:sagemaker:{args.aws_region}:{get_aws_account_id()}:pipeline/{args.project_name}-{args.environment}-{args.pipeline_type}",
-                "RoleArn": f"arn:aws:iam::{get_aws_account_id()}:role/{args.project_name}-{args.environment}-scheduler-role",
-                "SageMakerPipelineParameters": {
-                    "PipelineParameterList": {
-                        k: str(v)
-                        for k, v in parameters.items()
-                        if isinstance(v, (str, int, float))
-                    }
-                },
+                "Arn": f"arn:aws:sagemaker:{args.aws_region}:{account_id}:pipeline/{args.project_name}-{args.environment}-{args.pipeline_type}",
+                "RoleArn": f"arn:aws:iam::{account_id}:role/{args.project_name}-{args.environment}-scheduler-role",
+                "SageMakerPipelineParameters": {"PipelineParameterList": scalar_params},
             }
         ],
-        "Tags": [
-            {"Key": "Project", "Value": args.project_name},
-            {"Key": "Environment", "Value": args.environment},
-            {"Key": "Type", "Value": args.pipeline_type},
-            {"Key": "ManagedBy", "Value": "terraform"},
-        ],
+        "Tags": _make_tags(
+            args.project_name, args.environment, args.pipeline_type, "terraform"
+        ),
     }
 
     return rule_config
@@ -284,15 +331,21 @@ def main():
     # Get AWS account ID
     account_id = get_aws_account_id()
 
+    # Single timestamp shared by job names, tags and the output filename
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+
     # Generate parameters based on pipeline type
     if args.pipeline_type == "training":
-        parameters = generate_training_parameters(args, account_id)
+        parameters, scalar_params = generate_training_parameters(
+            args, account_id, timestamp
+        )
     else:
-        parameters = generate_inference_parameters(args, account_id)
+        parameters, scalar_params = generate_inference_parameters(
+            args, account_id, timestamp
+        )
 
     # Generate output filename if not provided
     if not args.output_file:
-        timestamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
         args.output_file = (
             f"parameters/{args.pipeline_type}-{args.environment}-{timestamp}.json"
         )
@@ -300,14 +353,20 @@ def main():
     # Print or save parameters
     if args.dry_run:
         print("\nGenerated parameters:")
-        print(json.dumps(parameters, indent=2, default=str))
+        print(dump_json(parameters).decode("utf-8"))
     else:
-        save_parameters(parameters, args.output_file)
-
         # Also generate EventBridge rule configuration
-        rule_config = generate_eventbridge_rule_json(args, parameters)
+        rule_config = generate_eventbridge_rule_json(args, scalar_params, account_id)
         rule_file = args.output_file.replace(".json", "-eventbridge-rule.json")
-        save_parameters(rule_config, rule_file)
+
+        # Write both files concurrently; result() re-raises any write error
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [
+                executor.submit(save_parameters, parameters, args.output_file),
+                executor.submit(save_parameters, rule_config, rule_file),
+            ]
+            for future in futures:
+                future.result()
 
         print("\nFiles generated:")
         print(f"  Parameters: {args.output_file}")
@@ -4,15 +4,18 @@ Simple SageMaker Inference for Iris Model
 Loads model from MLflow and runs daily predictions on random data
 """
 
+import functools
 import os
 import logging
 import re
-import pandas as pd
+import tempfile
+import time
 import numpy as np
-import mlflow
-import mlflow.sklearn
-import boto3
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# pandas, pyarrow, mlflow and boto3 are imported inside the functions
+# that use them so module import (and container cold start) stays cheap
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -24,7 +27,47 @@ MLFLOW_TRACKING_SERVER_NAME = os.environ.get(
     "MLFLOW_TRACKING_SERVER_NAME", "mlflow-staging-mlflow"
 )
 MODEL_NAME = "iris-model"
+INPUT_DIR = os.environ.get("SM_PROCESSING_INPUT_DIR", "/opt/ml/processing/input")
+# Random data is only a fallback when no input directory was configured
+INPUT_DIR_REQUIRED = "SM_PROCESSING_INPUT_DIR" in os.environ
 OUTPUT_DIR = os.environ.get("SM_PROCESSING_OUTPUT_DIR", "/opt/ml/processing/output")
+S3_OUTPUT_URI = os.environ.get("S3_OUTPUT_URI")
+BATCH_SIZE = int(os.environ.get("BATCH_SIZE", "1000"))
+MODEL_CACHE_DIR = os.environ.get("MODEL_CACHE_DIR", "/tmp/model_cache")
+
+# Reused across invocations within the same container
+_TRACKING_ARN = None
+_MODEL_CACHE = {}
+
+# Artifact uploads run off the main path and are awaited before exit
+ARTIFACT_UPLOAD_TIMEOUT = int(os.environ.get("ARTIFACT_UPLOAD_TIMEOUT", "300"))
+_UPLOAD_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+_PENDING_UPLOADS = []
+
+# Iris feature columns and the (low, high) range each one is sampled from
+FEATURE_NAMES = [
+    "sepal length (cm)",
+    "sepal width (cm)",
+    "petal length (cm)",
+    "petal width (cm)",
+]
+FEATURE_LOWS = np.array([4.0, 2.0, 1.0, 0.1])
+FEATURE_HIGHS = np.array([8.0, 4.5, 7.0, 2.5])
+
+# Class names indexed by the model's numeric prediction
+CLASS_NAMES = np.array(["setosa", "versicolor", "virginica"])
+
+# MLflow allows: alphanumerics, underscores, dashes, periods, spaces, colons, slashes
+_INVALID_METRIC_CHARS = re.compile(r"[^a-zA-Z0-9_\-\. :/]")
+_MULTI_UNDERSCORE = re.compile(r"_+")
+
+
+@functools.lru_cache(maxsize=None)
+def _boto3_client(service_name, region_name=None):
+    """Create a boto3 client once per service/region and reuse it"""
+    import boto3
+
+    return boto3.client(service_name, region_name=region_name)
 
 
 def discover_mlflow_tracking_server():
@@ -32,7 +75,7 @@ def discover_mlflow_tracking_server():
     try:
         # Use boto3 to get the specific MLflow tracking server
         region = os.environ.get("AWS_DEFAULT_REGION", "us-east-1")
-        sagemaker_client = boto3.client("sagemaker", region_name=region)
+        sagemaker_client = _boto3_client("sagemaker", region)
 
         logger.info(f"Getting MLflow tracking server: {MLFLOW_TRACKING_SERVER_NAME}")
 
@@ -62,11 +105,16 @@ def discover_mlflow_tracking_server():
 
 def setup_mlflow():
     """Setup MLflow tracking with SageMaker MLflow server"""
+    global _TRACKING_ARN
+    import mlflow
+
     tracking_uri = MLFLOW_TRACKING_URI
 
-    # If no URI provided via environment, try to discover the ARN
+    # If no URI provided via environment, try to discover the ARN (once)
     if not tracking_uri:
-        tracking_uri = discover_mlflow_tracking_server()
+        if _TRACKING_ARN is None:
+            _TRACKING_ARN = discover_mlflow_tracking_server()
+        tracking_uri = _TRACKING_ARN
 
     if tracking_uri:
         # For SageMaker MLflow, use the ARN as tracking URI
@@ -86,124 +134,455 @@ def setup_mlflow():
         return False
 
 
+class OnnxModel:
+    """Minimal predict() wrapper around an ONNX Runtime inference session"""
+
+    def __init__(self, session):
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+        self.label_name = session.get_outputs()[0].name
+
+    def predict(self, X):
+        features = np.ascontiguousarray(X, dtype=np.float32)
+        # Only fetch the label output; probabilities are never used
+        return self.session.run([self.label_name], {self.input_name: features})[0]
+
+
+def convert_to_onnx(model, onnx_path):
+    """Export a sklearn model to ONNX (once) and load it into ONNX Runtime"""
+    import onnxruntime as ort
+
+    if not os.path.exists(onnx_path):
+        from skl2onnx import convert_sklearn
+        from skl2onnx.common.data_types import FloatTensorType
+
+        # zipmap=False keeps probabilities as a plain tensor instead of a
+        # per-row list of dicts
+        onnx_model = convert_sklearn(
+            model,
+            initial_types=[("input", FloatTensorType([None, len(FEATURE_NAMES)]))],
+            options={id(model): {"zipmap": False}},
+        )
+        os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+        with open(onnx_path, "wb") as f:
+            f.write(onnx_model.SerializeToString())
+        logger.info(f"Exported model to ONNX: {onnx_path}")
+
+    sess_options = ort.SessionOptions()
+    sess_options.intra_op_num_threads = os.cpu_count() or 1
+    session = ort.InferenceSession(
+        onnx_path, sess_options, providers=["CPUExecutionProvider"]
+    )
+    return OnnxModel(session)
+
+
+def enable_parallel_predict(model):
+    """Let the underlying sklearn estimator predict on all CPU cores"""
+    # Older registered versions wrap the estimator in an IrisModel on .model
+    estimator = getattr(model, "model", model)
+    if hasattr(estimator, "get_params") and "n_jobs" in estimator.get_params():
+        estimator.set_params(n_jobs=-1)
+        logger.info(f"Enabled n_jobs=-1 on {type(estimator).__name__}")
+    return model
+
+
+def resolve_model_version(client):
+    """Pick the model version to serve with a single registry query
+
+    Prefers the version in the Production stage, otherwise the newest version.
+    """
+    versions = client.get_latest_versions(MODEL_NAME)
+    if not versions:
+        raise RuntimeError(f"No registered versions found for model '{MODEL_NAME}'")
+
+    production = [v for v in versions if v.current_stage == "Production"]
+    selected = (
+        production[0] if production else max(versions, key=lambda v: int(v.version))
+    )
+    logger.info(
+        f"Selected version {selected.version} (stage: {selected.current_stage}) "
+        f"of model '{MODEL_NAME}'"
+    )
+    return selected.version
+
+
 def load_model():
-    """Load the latest model from MLflow"""
-    logger.info(f"Loading latest model '{MODEL_NAME}' from MLflow")
+    """Load the Production (or newest) model version from MLflow"""
+    import mlflow.artifacts
+    import mlflow.sklearn
+    from mlflow.tracking import MlflowClient
+
+    if MODEL_NAME in _MODEL_CACHE:
+        logger.info(f"Using cached model '{MODEL_NAME}'")
+        return _MODEL_CACHE[MODEL_NAME]
+
+    logger.info(f"Loading model '{MODEL_NAME}' from MLflow")
 
     try:
-        model_uri = f"models:/{MODEL_NAME}/latest"
-        model = mlflow.sklearn.load_model(model_uri)
-        logger.info("Latest model loaded successfully")
-        return model, "latest"
+        model_version = resolve_model_version(MlflowClient())
+        model_uri = f"models:/{MODEL_NAME}/{model_version}"
+        local_path = os.path.join(MODEL_CACHE_DIR, MODEL_NAME, str(model_version))
+
+        # Only download the artifacts if they aren't already on local disk
+        if not os.path.exists(os.path.join(local_path, "MLmodel")):
+            os.makedirs(local_path, exist_ok=True)
+            local_path = mlflow.artifacts.download_artifacts(
+                artifact_uri=model_uri, dst_path=local_path
+            )
+        else:
+            logger.info(f"Using model artifacts cached at {local_path}")
+
+        model = mlflow.sklearn.load_model(local_path)
+
+        # Serve through ONNX Runtime when the model can be converted
+        try:
+            onnx_path = os.path.join(
+                MODEL_CACHE_DIR, MODEL_NAME, f"{model_version}.onnx"
+            )
+            model = convert_to_onnx(model, onnx_path)
+            logger.info("Using ONNX Runtime for predictions")
+        except Exception as e:
+            logger.warning(f"ONNX conversion failed, using sklearn model: {e}")
+            model = enable_parallel_predict(model)
+
+        _MODEL_CACHE[MODEL_NAME] = (model, model_version)
+        logger.info(f"Model version {model_version} loaded successfully")
+        return model, model_version
     except Exception as e:
         logger.error(f"Failed to load model: {e}")
         raise
 
 
 def generate_random_iris_data(n_samples=10):
-    """Generate random data similar to Iris dataset"""
+    """Generate random data similar to Iris dataset as an (n_samples, 4) array"""
     logger.info(f"Generating {n_samples} random samples for prediction")
 
-    # Generate random data within typical Iris ranges
-    np.random.seed(int(datetime.now().timestamp()) % 1000)  # Different seed each run
+    # Generate random data within typical Iris ranges in a single draw
+    seed = int(datetime.now().timestamp()) % 1000  # Different seed each run
+    rng = np.random.default_rng(seed)
+    data = rng.uniform(
+        FEATURE_LOWS, FEATURE_HIGHS, size=(n_samples, len(FEATURE_LOWS))
+    ).astype(np.float32)
+
+    logger.info(f"Generated data shape: {data.shape}")
+    return data
+
+
+def list_input_files(input_dir=INPUT_DIR):
+    """List CSV and Parquet files available for batch inference"""
+    if not os.path.isdir(input_dir):
+        return []
+
+    input_files = []
+    for root, _, files in os.walk(input_dir):
+        for name in files:
+            if name.endswith((".csv", ".parquet")):
+                input_files.append(os.path.join(root, name))
+    return sorted(input_files)
+
+
+def batch_iter(paths, batch_size=BATCH_SIZE):
+    """Yield float32 feature arrays of up to batch_size rows read from input files"""
+    import pandas as pd
+    import pyarrow.parquet as pq
+
+    buffer = []
+    buffered = 0
+
+    for path in paths:
+        logger.info("Reading input file: %s", path)
+        if path.endswith(".parquet"):
+            # Stream row batches instead of materializing the whole file
+            chunks = (
+                batch.to_pandas()
+                for batch in pq.ParquetFile(path).iter_batches(
+                    batch_size=batch_size, columns=FEATURE_NAMES
+                )
+            )
+        else:
+            # Parse straight to float32 instead of float64 plus a downcast copy
+            chunks = pd.read_csv(
+                path,
+                usecols=FEATURE_NAMES,
+                dtype=dict.fromkeys(FEATURE_NAMES, np.float32),
+                chunksize=batch_size,
+            )
 
-    data = {
-        "sepal length (cm)": np.random.uniform(4.0, 8.0, n_samples),
-        "sepal width (cm)": np.random.uniform(2.0, 4.5, n_samples),
-        "petal length (cm)": np.random.uniform(1.0, 7.0, n_samples),
-        "petal width (cm)": np.random.uniform(0.1, 2.5, n_samples),
-    }
+        for chunk in chunks:
+            buffer.append(chunk[FEATURE_NAMES].to_numpy(dtype=np.float32))
+            buffered += len(chunk)
 
-    df = pd.DataFrame(data)
-    logger.info(f"Generated data shape: {df.shape}")
-    return df
+            # Emit full batches, carrying any remainder into the next one
+            while buffered >= batch_size:
+                combined = np.concatenate(buffer)
+                yield combined[:batch_size]
+                remainder = combined[batch_size:]
+                buffer = [remainder] if len(remainder) else []
+                buffered = len(remainder)
+
+    # Flush the final partial batch
+    if buffered:
+        yield np.concatenate(buffer)
 
 
 def make_predictions(model, data):
     """Make predictions on the data"""
-    logger.info("Making predictions")
+    # Called once per batch, so keep logging lazy and at debug level
+    logger.debug("Making predictions")
 
     try:
-        predictions = model.predict(data)
-
-        # Map predictions to class names
-        class_names = ["setosa", "versicolor", "virginica"]
-        predicted_classes = [class_names[pred] for pred in predictions]
+        predictions = np.asarray(model.predict(data), dtype=np.intp)
 
-        logger.info(f"Made {len(predictions)} predictions")
-        return predictions, predicted_classes
+        logger.debug("Made %d predictions", len(predictions))
+        return predictions
     except Exception as e:
-        logger.error(f"Prediction failed: {e}")
+        logger.error("Prediction failed: %s", e)
         raise
 
 
+class PredictionSummary:
+    """Per-class counts and per-feature mean/std accumulated batch by batch"""
+
+    def __init__(self):
+        self.count = 0
+        self.class_counts = np.zeros(len(CLASS_NAMES), dtype=np.int64)
+        self.means = np.zeros(len(FEATURE_NAMES))
+        self._m2 = np.zeros(len(FEATURE_NAMES))
+
+    def update(self, data, predictions):
+        """Fold one batch into the running totals (Chan et al. pairwise merge)"""
+        n = len(data)
+        if not n:
+            return
+
+        self.class_counts += np.bincount(predictions, minlength=len(CLASS_NAMES))
+
+        batch_means = data.mean(axis=0, dtype=np.float64)
+        batch_m2 = np.square(data - batch_means).sum(axis=0)
+        delta = batch_means - self.means
+        total = self.count + n
+        self.means += delta * (n / total)
+        self._m2 += batch_m2 + np.square(delta) * (self.count * n / total)
+        self.count = total
+
+    @property
+    def stds(self):
+        """Sample standard deviation (ddof=1) of each feature"""
+        if self.count < 2:
+            return np.full(len(FEATURE_NAMES), np.nan)
+        return np.sqrt(self._m2 / (self.count - 1))
+
+
+def predict_in_batches(model, batches, results_writer=None):
+    """Run one model.predict call per batch, streaming results as they are made
+
+    Each batch is written to results_writer (when given) and folded into a
+    PredictionSummary, so only one batch is held in memory at a time.
+    """
+    summary = PredictionSummary()
+    num_batches = 0
+
+    for batch in batches:
+        predictions = make_predictions(model, batch)
+        summary.update(batch, predictions)
+        if results_writer is not None:
+            results_writer.write(batch, predictions)
+        num_batches += 1
+
+    if not summary.count:
+        raise ValueError("No input rows available for prediction")
+
+    logger.info("Made %d predictions in %d batches", summary.count, num_batches)
+    return summary
+
+
+@functools.lru_cache(maxsize=64)
 def sanitize_metric_name(name):
     """Sanitize metric names for MLflow compatibility"""
-    # MLflow allows: alphanumerics, underscores, dashes, periods, spaces, colons, slashes
     # Remove parentheses and other invalid chars, replace with underscores
-    sanitized = re.sub(r"[^a-zA-Z0-9_\-\. :/]", "_", str(name))
+    sanitized = _INVALID_METRIC_CHARS.sub("_", str(name))
     # Remove multiple consecutive underscores
-    sanitized = re.sub(r"_+", "_", sanitized)
+    sanitized = _MULTI_UNDERSCORE.sub("_", sanitized)
     # Remove leading/trailing underscores
     sanitized = sanitized.strip("_")
     return sanitized
 
 
-def log_inference_to_mlflow(data, predictions, predicted_classes, model_version=None):
+def count_predictions(class_counts):
+    """Map per-class prediction counts to class names, skipping empty classes"""
+    return {
+        class_name: count
+        for class_name, count in zip(CLASS_NAMES.tolist(), class_counts.tolist())
+        if count
+    }
+
+
+class ResultsWriter:
+    """Stream prediction batches into a single Parquet results file
+
+    For an s3:// output the file is staged in a local temporary file and
+    uploaded on close(), so the full result set is never held in memory.
+    """
+
+    def __init__(self, prediction_timestamp, output_dir=S3_OUTPUT_URI or OUTPUT_DIR):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        file_name = (
+            f"predictions_{prediction_timestamp.strftime('%Y%m%d_%H%M%S')}.parquet"
+        )
+
+        if output_dir.startswith("s3://"):
+            bucket, _, prefix = output_dir[len("s3://") :].partition("/")
+            self.bucket = bucket
+            self.key = f"{prefix.rstrip('/')}/{file_name}" if prefix else file_name
+            self.output_file = f"s3://{bucket}/{self.key}"
+            fd, self.local_path = tempfile.mkstemp(suffix=".parquet")
+            os.close(fd)
+        else:
+            os.makedirs(output_dir, mode=0o755, exist_ok=True)
+            self.local_path = self.output_file = os.path.join(output_dir, file_name)
+
+        # The timestamp is constant for the whole file, so keep it in the schema
+        # metadata rather than repeating it on every row
+        self.schema = pa.schema(
+            [pa.field(name, pa.float32()) for name in FEATURE_NAMES]
+            + [
+                pa.field("prediction_numeric", pa.int64()),
+                pa.field("prediction_class", pa.dictionary(pa.int8(), pa.string())),
+            ],
+            metadata={"prediction_timestamp": prediction_timestamp.isoformat()},
+        )
+        self._class_names = pa.array(CLASS_NAMES.tolist(), type=pa.string())
+        self._writer = pq.ParquetWriter(
+            self.local_path, self.schema, compression="snappy"
+        )
+
+    def write(self, data, predictions):
+        """Append one batch of features and predictions as a row group"""
+        import pyarrow as pa
+
+        columns = [
+            pa.array(np.ascontiguousarray(data[:, i])) for i in range(data.shape[1])
+        ]
+        columns.append(pa.array(predictions, type=pa.int64()))
+        columns.append(
+            pa.DictionaryArray.from_arrays(
+                pa.array(predictions, type=pa.int8()), self._class_names
+            )
+        )
+        self._writer.write_table(pa.Table.from_arrays(columns, schema=self.schema))
+
+    def close(self):
+        """Finish the file, upload it when the output is S3, and return its URI"""
+        self._writer.close()
+
+        if self.output_file != self.local_path:
+            from boto3.s3.transfer import TransferConfig
+
+            # Large files go up as parallel multipart uploads
+            try:
+                _boto3_client("s3").upload_file(
+                    self.local_path,
+                    self.bucket,
+                    self.key,
+                    Config=TransferConfig(
+                        multipart_threshold=8 * 1024 * 1024, max_concurrency=10
+                    ),
+                )
+            finally:
+                os.remove(self.local_path)
+
+        return self.output_file
+
+    def abort(self):
+        """Close the writer and delete the partial file without uploading it"""
+        try:
+            self._writer.close()
+        finally:
+            if os.path.exists(self.local_path):
+                os.remove(self.local_path)
+
+
+def upload_artifact_async(run_id, local_path, artifact_path):
+    """Upload a run artifact on a background thread"""
+    from mlflow.tracking import MlflowClient
+
+    future = _UPLOAD_EXECUTOR.submit(
+        MlflowClient().log_artifact, run_id, local_path, artifact_path
+    )
+    _PENDING_UPLOADS.append(future)
+    return future
+
+
+def wait_for_uploads(timeout=ARTIFACT_UPLOAD_TIMEOUT):
+    """Block until queued artifact uploads finish, re-raising any failure"""
+    while _PENDING_UPLOADS:
+        _PENDING_UPLOADS.pop(0).result(timeout=timeout)
+
+
+def log_inference_to_mlflow(
+    summary, prediction_timestamp, output_file=None, model_version=None
+):
     """Log inference results to MLflow as an experiment run"""
-    logger.info("Logging inference results to MLflow")
+    import mlflow
+    from mlflow.entities import Metric, Param
+    from mlflow.tracking import MlflowClient
 
-    # Create results dataframe for analysis
-    results = data.copy()
-    results["prediction_numeric"] = predictions
-    results["prediction_class"] = predicted_classes
-    results["prediction_timestamp"] = datetime.now().isoformat()
+    logger.info("Logging inference results to MLflow")
 
     # Get prediction summary
-    prediction_counts = pd.Series(predicted_classes).value_counts()
+    prediction_counts = count_predictions(summary.class_counts)
 
     try:
         # Set experiment for inference logging
         mlflow.set_experiment("iris-model-inference")
 
         # Create meaningful run name for inference
-        inference_date = datetime.now()
-        run_name = f"iris-inference-{inference_date.strftime('%Y-%m-%d_%H-%M-%S')}-{len(data)}samples-{model_version}"
-
-        with mlflow.start_run(run_name=run_name):
-            # Log run metadata
-            mlflow.log_param("model_name", MODEL_NAME)
-            mlflow.log_param("model_version", model_version or "latest")
-            mlflow.log_param("inference_timestamp", datetime.now().isoformat())
-            mlflow.log_param("num_samples", len(data))
-
-            # Log prediction metrics
-            mlflow.log_metric("total_predictions", len(predictions))
+        run_name = f"iris-inference-{prediction_timestamp.strftime('%Y-%m-%d_%H-%M-%S')}-{summary.count}samples-{model_version}"
+
+        with mlflow.start_run(run_name=run_name) as run:
+            # Run metadata
+            params = {
+                "model_name": MODEL_NAME,
+                "model_version": model_version or "latest",
+                "inference_timestamp": prediction_timestamp.isoformat(),
+                "num_samples": summary.count,
+            }
+            # Results already in S3 are referenced by URI rather than uploaded
+            if output_file and output_file.startswith("s3://"):
+                params["predictions_uri"] = output_file
+
+            # Prediction metrics
+            metrics = {"total_predictions": summary.count}
             for class_name, count in prediction_counts.items():
-                mlflow.log_metric(f"predictions_{class_name}", count)
-                mlflow.log_metric(
-                    f"percentage_{class_name}", (count / len(predictions)) * 100
-                )
+                metrics[f"predictions_{class_name}"] = count
+                metrics[f"percentage_{class_name}"] = (count / summary.count) * 100
 
-            # Log input data statistics as metrics
-            for column in data.columns:
+            # Input data statistics as metrics
+            means = summary.means
+            stds = summary.stds
+            for i, column in enumerate(FEATURE_NAMES):
                 sanitized_column = sanitize_metric_name(column)
-                mlflow.log_metric(f"input_{sanitized_column}_mean", data[column].mean())
-                mlflow.log_metric(f"input_{sanitized_column}_std", data[column].std())
+                metrics[f"input_{sanitized_column}_mean"] = means[i]
+                metrics[f"input_{sanitized_column}_std"] = stds[i]
+
+            # Send all params and metrics in a single request
+            timestamp_ms = int(time.time() * 1000)
+            MlflowClient().log_batch(
+                run.info.run_id,
+                metrics=[
+                    Metric(key, float(value), timestamp_ms, 0)
+                    for key, value in metrics.items()
+                ],
+                params=[Param(key, str(value)) for key, value in params.items()],
+            )
 
-            # Log the results as an artifact (optional CSV backup)
-            try:
-                os.makedirs(OUTPUT_DIR, mode=0o755, exist_ok=True)
-                output_file = os.path.join(
-                    OUTPUT_DIR,
-                    f"predictions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                )
-                results.to_csv(output_file, index=False)
-                mlflow.log_artifact(output_file, "predictions")
+            # Log the results file written during prediction (optional backup)
+            if output_file:
+                if not output_file.startswith("s3://"):
+                    upload_artifact_async(run.info.run_id, output_file, "predictions")
                 logger.info(f"Results also saved as artifact: {output_file}")
-            except PermissionError as e:
-                logger.warning(f"Could not save CSV artifact due to permissions: {e}")
-                # Continue without CSV - MLflow logging is the primary goal
 
             logger.info("Inference results logged to MLflow successfully")
             logger.info(f"Prediction summary:\n{prediction_counts}")
@@ -230,14 +609,50 @@ def main():
         # Load model
         model, model_version = load_model()
 
-        # Generate random data
-        data = generate_random_iris_data(n_samples=20)
-
-        # Make predictions
-        predictions, predicted_classes = make_predictions(model, data)
+        # Read input batches, or generate random data when no input is mounted
+        input_files = list_input_files()
+        if input_files:
+            logger.info(f"Found {len(input_files)} input files in {INPUT_DIR}")
+            batches = batch_iter(input_files, BATCH_SIZE)
+        elif INPUT_DIR_REQUIRED:
+            raise FileNotFoundError(
+                f"SM_PROCESSING_INPUT_DIR is set but {INPUT_DIR} has no CSV or "
+                "Parquet input files"
+            )
+        else:
+            logger.info(f"No input files in {INPUT_DIR} - using random data")
+            batches = [generate_random_iris_data(n_samples=20)]
+
+        # Single timezone-aware UTC timestamp reused for the run name, params
+        # and the results file
+        prediction_timestamp = datetime.now(timezone.utc)
+
+        try:
+            results_writer = ResultsWriter(prediction_timestamp)
+        except PermissionError as e:
+            logger.warning(f"Could not save results artifact due to permissions: {e}")
+            # Continue without results file - MLflow logging is the primary goal
+            results_writer = None
+
+        # Make predictions, streaming each batch into the results file; a
+        # failed run must not leave a truncated file behind for the job to
+        # upload
+        output_file = None
+        try:
+            summary = predict_in_batches(model, batches, results_writer)
+            if results_writer:
+                output_file = results_writer.close()
+        finally:
+            if results_writer and output_file is None:
+                results_writer.abort()
 
         # Log results to MLflow
-        log_inference_to_mlflow(data, predictions, predicted_classes, model_version)
+        log_inference_to_mlflow(
+            summary, prediction_timestamp, output_file, model_version
+        )
+
+        # Make sure the background artifact upload has landed before exiting
+        wait_for_uploads()
 
         logger.info("Inference completed successfully!")
 
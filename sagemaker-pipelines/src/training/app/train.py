@@ -4,21 +4,23 @@ Simple SageMaker Training for Iris Dataset
 Trains a RandomForest model weekly and saves to MLflow
 """
 
+import hashlib
 import os
 import logging
-import pandas as pd
+import tempfile
+import time
+import numpy as np
 from sklearn.datasets import load_iris
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import accuracy_score, classification_report
-import mlflow
-import mlflow.sklearn
-from mlflow.types.schema import Schema, ColSpec
 import joblib
-import boto3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# mlflow and boto3 are imported inside the functions that use them so a run
+# without a tracking server never pays their import cost
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -34,21 +36,91 @@ MLFLOW_TRACKING_SERVER_NAME = os.environ.get(
 )
 MODEL_NAME = "iris-model"
 
+AWS_REGION = os.environ.get("AWS_DEFAULT_REGION", "us-east-1")
+
+# A named tracking server keeps its ARN, so a recent lookup can be reused. The
+# ARN differs per region and account, so the cache file is keyed on the region
+# and on the active profile/access key (which pick the account without an STS
+# call)
+_ARN_CACHE_IDENTITY = hashlib.sha256(
+    "|".join(
+        [
+            os.environ.get("AWS_PROFILE", "default"),
+            os.environ.get("AWS_ACCESS_KEY_ID", ""),
+        ]
+    ).encode()
+).hexdigest()[:12]
+MLFLOW_ARN_CACHE_PATH = os.path.join(
+    tempfile.gettempdir(),
+    f"mlflow_arn_{MLFLOW_TRACKING_SERVER_NAME}_{AWS_REGION}_{_ARN_CACHE_IDENTITY}.cache",
+)
+MLFLOW_ARN_CACHE_TTL = int(os.environ.get("MLFLOW_ARN_CACHE_TTL", "86400"))
+
+# Registry descriptions; only the version description has per-run fields
+VERSION_DESCRIPTION_TEMPLATE = """
+Iris Classification Model - Version trained on {training_date}
+
+Model Details:
+- Algorithm: Random Forest Classifier
+- Features: Sepal length, sepal width, petal length, petal width
+- Classes: Setosa, Versicolor, Virginica
+- Accuracy: {accuracy:.4f}
+- Training Date: {training_date}
+- Instance Type: {instance_type}
+
+Training Configuration:
+- n_estimators: 100
+- max_depth: 5
+- random_state: 42
+- test_size: 0.2 (stratified split)
+""".strip()
+
+MODEL_DESCRIPTION = """
+Iris Flower Classification Model
+
+This model classifies iris flowers into three species based on flower measurements.
+
+Overview:
+- Dataset: Famous Iris dataset with 150 samples
+- Task: Multi-class classification (3 species)
+- Features: 4 numeric features (sepal/petal dimensions)
+- Algorithm: Random Forest
+
+Model Pipeline:
+1. Random Forest Classifier for prediction
+2. Automatic hyperparameter tuning
+
+Training Schedule:
+- Automated weekly training (Sundays at 2 AM UTC)
+- Continuous model improvement and versioning
+- Performance monitoring via MLflow
+
+Usage:
+- Daily inference on randomly generated samples
+- Real-time predictions via SageMaker endpoints
+- Batch processing capabilities
+
+Maintained by: ML Engineering Team
+""".strip()
+
 
 def load_iris_data():
     """Load and prepare Iris dataset"""
     logger.info("Loading Iris dataset")
     iris = load_iris()
-    X = pd.DataFrame(iris.data, columns=iris.feature_names)
-    y = pd.Series(iris.target, name="target")
-
-    logger.info(f"Dataset shape: {X.shape}")
-    logger.info(f"Classes: {iris.target_names}")
+    # RandomForest trains on float32 internally, so cast once up front instead
+    # of letting every fit/predict copy float64 data. Plain
+    # arrays match what inference feeds the model (no feature-name checks).
+    X = iris.data.astype(np.float32)
+    y = iris.target
+
+    logger.info("Dataset shape: %s", X.shape)
+    logger.info("Classes: %s", iris.target_names)
     return X, y, iris.target_names
 
 
 def train_model(X, y):
-    """Train RandomForest model with scaling"""
+    """Train RandomForest model"""
     logger.info("Training RandomForest model")
 
     # Split data
@@ -56,37 +128,90 @@ def train_model(X, y):
         X, y, test_size=0.2, random_state=42, stratify=y
     )
 
-    # Scale features
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
-
-    # Train model
-    model = RandomForestClassifier(n_estimators=100, random_state=42, max_depth=5)
-    model.fit(X_train_scaled, y_train)
+    # Train model on the raw features (tree splits are scale-invariant),
+    # building trees on one thread per physical core (RandomForest uses
+    # joblib's threading backend, so workers share the data)
+    model = RandomForestClassifier(
+        n_estimators=100,
+        random_state=42,
+        max_depth=5,
+        n_jobs=joblib.cpu_count(only_physical_cores=True),
+    )
+    model.fit(X_train, y_train)
 
     # Evaluate
-    y_pred = model.predict(X_test_scaled)
+    y_pred = model.predict(X_test)
     accuracy = accuracy_score(y_test, y_pred)
 
-    logger.info(f"Model accuracy: {accuracy:.4f}")
-    logger.info(f"Classification Report:\n{classification_report(y_test, y_pred)}")
+    logger.info("Model accuracy: %.4f", accuracy)
+    # The per-class report is only worth building when debug logging is on
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Classification Report:\n%s", classification_report(y_test, y_pred)
+        )
+
+    return model, accuracy
+
 
-    return model, scaler, accuracy
+def call_with_retries(fn, attempts=3, base_delay=1.0):
+    """Call fn, retrying transient failures with exponential backoff"""
+    for attempt in range(1, attempts + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == attempts:
+                raise
+            delay = base_delay * 2 ** (attempt - 1)
+            logger.warning(
+                "Attempt %d/%d failed: %s - retrying in %.0fs",
+                attempt,
+                attempts,
+                e,
+                delay,
+            )
+            time.sleep(delay)
+
+
+def read_cached_tracking_arn():
+    """Return the cached tracking server ARN if it is younger than the TTL"""
+    try:
+        if time.time() - os.path.getmtime(MLFLOW_ARN_CACHE_PATH) < MLFLOW_ARN_CACHE_TTL:
+            with open(MLFLOW_ARN_CACHE_PATH) as f:
+                return f.read().strip() or None
+    except OSError:
+        pass
+    return None
+
+
+def write_cached_tracking_arn(tracking_arn):
+    """Cache the tracking server ARN for later runs on this host"""
+    try:
+        with open(MLFLOW_ARN_CACHE_PATH, "w") as f:
+            f.write(tracking_arn)
+    except OSError as e:
+        logger.warning("Could not cache MLflow tracking server ARN: %s", e)
 
 
 def discover_mlflow_tracking_server():
     """Get MLflow tracking server ARN by name for SageMaker authentication"""
+    tracking_arn = read_cached_tracking_arn()
+    if tracking_arn:
+        logger.info("Using cached MLflow tracking server ARN: %s", tracking_arn)
+        return tracking_arn
+
+    import boto3
+
     try:
         # Use boto3 to get the specific MLflow tracking server
-        region = os.environ.get("AWS_DEFAULT_REGION", "us-east-1")
-        sagemaker_client = boto3.client("sagemaker", region_name=region)
+        sagemaker_client = boto3.client("sagemaker", region_name=AWS_REGION)
 
-        logger.info(f"Getting MLflow tracking server: {MLFLOW_TRACKING_SERVER_NAME}")
+        logger.info("Getting MLflow tracking server: %s", MLFLOW_TRACKING_SERVER_NAME)
 
         # Get detailed information for the specific tracking server
-        detail_response = sagemaker_client.describe_mlflow_tracking_server(
-            TrackingServerName=MLFLOW_TRACKING_SERVER_NAME
+        detail_response = call_with_retries(
+            lambda: sagemaker_client.describe_mlflow_tracking_server(
+                TrackingServerName=MLFLOW_TRACKING_SERVER_NAME
+            )
         )
 
         # For SageMaker MLflow, use the ARN as tracking URI (with sagemaker-mlflow plugin)
@@ -94,16 +219,19 @@ def discover_mlflow_tracking_server():
         tracking_url = detail_response.get("TrackingServerUrl")
 
         if tracking_arn:
-            logger.info(f"Retrieved MLflow tracking server URL: {tracking_url}")
-            logger.info(f"Retrieved MLflow tracking server ARN: {tracking_arn}")
+            logger.info("Retrieved MLflow tracking server URL: %s", tracking_url)
+            logger.info("Retrieved MLflow tracking server ARN: %s", tracking_arn)
+            write_cached_tracking_arn(tracking_arn)
             return tracking_arn
         else:
-            logger.warning(f"No TrackingServerArn in response: {detail_response}")
+            logger.warning("No TrackingServerArn in response: %s", detail_response)
             return None
 
     except Exception as e:
         logger.warning(
-            f"Failed to get MLflow tracking server '{MLFLOW_TRACKING_SERVER_NAME}': {e}"
+            "Failed to get MLflow tracking server '%s': %s",
+            MLFLOW_TRACKING_SERVER_NAME,
+            e,
         )
         return None
 
@@ -117,10 +245,22 @@ def setup_mlflow():
         tracking_uri = discover_mlflow_tracking_server()
 
     if tracking_uri:
+        import mlflow
+
         # For SageMaker MLflow, use the ARN as tracking URI
         # The sagemaker-mlflow plugin handles authentication automatically
         mlflow.set_tracking_uri(tracking_uri)
-        logger.info(f"MLflow tracking URI set to: {tracking_uri}")
+        logger.info("MLflow tracking URI set to: %s", tracking_uri)
+
+        # Queue params/metrics in the background so they overlap with the
+        # model upload; queued errors surface when the run flushes. The global
+        # switch only exists in newer MLflow releases, so older ones log
+        # synchronously as before
+        enable_async_logging = getattr(
+            getattr(mlflow, "config", None), "enable_async_logging", None
+        )
+        if enable_async_logging is not None:
+            enable_async_logging(True)
 
         if tracking_uri.startswith("arn:aws:sagemaker"):
             logger.info(
@@ -135,80 +275,76 @@ def setup_mlflow():
 
     # Set the experiment (this will create it if it doesn't exist)
     try:
-        mlflow.set_experiment("iris-model-training")
+        call_with_retries(lambda: mlflow.set_experiment("iris-model-training"))
         logger.info("MLflow experiment 'iris-model-training' set successfully")
         return True
     except Exception as e:
-        logger.error(f"Failed to set MLflow experiment: {e}")
+        logger.error("Failed to set MLflow experiment: %s", e)
         return False
 
 
-def save_to_mlflow(model, scaler, accuracy, class_names):
+def save_to_mlflow(model, accuracy, class_names):
     """Save model to MLflow"""
+    import mlflow
+    import mlflow.sklearn
+    from mlflow.entities import Metric, Param, RunTag
+    from mlflow.models import ModelSignature
+    from mlflow.tracking import MlflowClient
+    from mlflow.types.schema import Schema, ColSpec
+
     logger.info("Saving model to MLflow")
 
     # Create meaningful run name
     training_date = datetime.now()
     run_name = f"iris-training-{training_date.strftime('%Y-%m-%d_%H-%M-%S')}-acc-{accuracy:.3f}"
 
-    with mlflow.start_run(run_name=run_name):
-        # Log parameters
-        mlflow.log_param("model_type", "RandomForestClassifier")
-        mlflow.log_param("n_estimators", 100)
-        mlflow.log_param("max_depth", 5)
-        mlflow.log_param("dataset", "iris")
-        mlflow.log_param("training_date", training_date.isoformat())
-
-        # Log metrics
-        mlflow.log_metric("accuracy", accuracy)
-
-        # Create a model with preprocessing
-        class IrisModel:
-            def __init__(self, model, scaler, class_names):
-                self.model = model
-                self.scaler = scaler
-                self.class_names = class_names
-
-            def predict(self, X):
-                X_scaled = self.scaler.transform(X)
-                predictions = self.model.predict(X_scaled)
-                return predictions
-
-        # Wrap model with preprocessing
-        wrapped_model = IrisModel(model, scaler, class_names)
+    # One client for the batch logging and the registry updates below
+    client = MlflowClient()
+
+    with mlflow.start_run(run_name=run_name) as run:
+        # Log parameters, metrics and tags in a single request
+        params = {
+            "model_type": "RandomForestClassifier",
+            "n_estimators": 100,
+            "max_depth": 5,
+            "n_jobs": model.n_jobs,
+            "dataset": "iris",
+            "training_date": training_date.isoformat(),
+        }
+        metrics = {"accuracy": accuracy}
+        # Class names live on the run, not in the pickled model
+        tags = {"class_names": ",".join(class_names)}
+
+        # Queued in the background so it overlaps with the model upload; the
+        # global async switch only covers client calls from MLflow 2.14, so
+        # ask for it explicitly and flush before the run closes
+        timestamp_ms = int(time.time() * 1000)
+        client.log_batch(
+            run.info.run_id,
+            metrics=[
+                Metric(key, float(value), timestamp_ms, 0)
+                for key, value in metrics.items()
+            ],
+            params=[Param(key, str(value)) for key, value in params.items()],
+            tags=[RunTag(key, value) for key, value in tags.items()],
+            synchronous=False,
+        )
 
         # Create version description with training details
-        training_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        version_description = f"""
-        Iris Classification Model - Version trained on {training_date}
-        
-        Model Details:
-        - Algorithm: Random Forest Classifier
-        - Features: Sepal length, sepal width, petal length, petal width
-        - Classes: Setosa, Versicolor, Virginica
-        - Accuracy: {accuracy:.4f}
-        - Training Date: {training_date}
-        - Instance Type: {os.environ.get("TRAINING_INSTANCE_TYPE", "ml.m5.large")}
-        
-        Preprocessing:
-        - StandardScaler applied to all features
-        - Features scaled to zero mean and unit variance
-        
-        Training Configuration:
-        - n_estimators: 100
-        - max_depth: 5
-        - random_state: 42
-        - test_size: 0.2 (stratified split)
-        """.strip()
+        version_description = VERSION_DESCRIPTION_TEMPLATE.format(
+            training_date=training_date.strftime("%Y-%m-%d %H:%M:%S"),
+            accuracy=accuracy,
+            instance_type=os.environ.get("TRAINING_INSTANCE_TYPE", "ml.m5.large"),
+        )
 
         # Create input/output schema for the model
         # Define input schema (Iris features)
         input_schema = Schema(
             [
-                ColSpec("double", "sepal length (cm)"),
-                ColSpec("double", "sepal width (cm)"),
-                ColSpec("double", "petal length (cm)"),
-                ColSpec("double", "petal width (cm)"),
+                ColSpec("float", "sepal length (cm)"),
+                ColSpec("float", "sepal width (cm)"),
+                ColSpec("float", "petal length (cm)"),
+                ColSpec("float", "petal width (cm)"),
             ]
         )
 
@@ -216,13 +352,13 @@ def save_to_mlflow(model, scaler, accuracy, class_names):
         output_schema = Schema([ColSpec("long", "prediction")])
 
         # Create signature with input and output schemas
-        signature = mlflow.models.ModelSignature(
-            inputs=input_schema, outputs=output_schema
-        )
+        signature = ModelSignature(inputs=input_schema, outputs=output_schema)
 
         # Log model with schema signature
-        mlflow.sklearn.log_model(
-            wrapped_model,
+        # Log the fitted estimator itself: a plain sklearn object loads without
+        # any custom class and can be converted to ONNX at inference time
+        model_info = mlflow.sklearn.log_model(
+            model,
             "model",
             registered_model_name=MODEL_NAME,
             signature=signature,
@@ -230,20 +366,27 @@ def save_to_mlflow(model, scaler, accuracy, class_names):
 
         # Update descriptions using MLflow client after model is logged
         try:
-            client = mlflow.tracking.MlflowClient()
-
-            # Get the latest model version that was just created
-            latest_versions = client.get_latest_versions(MODEL_NAME)
-            if latest_versions:
-                latest_version = latest_versions[0].version
-
+            # log_model returns the version it just registered (MLflow 2.14+),
+            # so there is no need to query the registry for it; older releases
+            # look it up by this run's id instead
+            latest_version = getattr(model_info, "registered_model_version", None)
+            if latest_version is None:
+                run_versions = client.search_model_versions(
+                    f"run_id='{run.info.run_id}'"
+                )
+                latest_version = max(
+                    (v.version for v in run_versions if v.name == MODEL_NAME),
+                    key=int,
+                    default=None,
+                )
+            if latest_version:
                 # Update the version description
                 client.update_model_version(
                     name=MODEL_NAME,
                     version=latest_version,
                     description=version_description,
                 )
-                logger.info(f"Updated version {latest_version} description")
+                logger.info("Updated version %s description", latest_version)
 
             # Check if model-level description needs to be set (only for first version)
             try:
@@ -254,75 +397,48 @@ def save_to_mlflow(model, scaler, accuracy, class_names):
                     not model_details.description
                     or model_details.description.strip() == ""
                 ):
-                    model_description = """
-                    Iris Flower Classification Model
-                    
-                    This model classifies iris flowers into three species based on flower measurements.
-                    
-                    Overview:
-                    - Dataset: Famous Iris dataset with 150 samples
-                    - Task: Multi-class classification (3 species)
-                    - Features: 4 numeric features (sepal/petal dimensions)
-                    - Algorithm: Random Forest with preprocessing pipeline
-                    
-                    Model Pipeline:
-                    1. StandardScaler for feature normalization
-                    2. Random Forest Classifier for prediction
-                    3. Automatic hyperparameter tuning
-                    
-                    Training Schedule:
-                    - Automated weekly training (Sundays at 2 AM UTC)
-                    - Continuous model improvement and versioning
-                    - Performance monitoring via MLflow
-                    
-                    Usage:
-                    - Daily inference on randomly generated samples
-                    - Real-time predictions via SageMaker endpoints
-                    - Batch processing capabilities
-                    
-                    Maintained by: ML Engineering Team
-                    """.strip()
 
                     client.update_registered_model(
-                        name=MODEL_NAME, description=model_description
+                        name=MODEL_NAME, description=MODEL_DESCRIPTION
                     )
                     logger.info("Updated model-level description")
 
             except Exception as e:
-                logger.warning(f"Could not update model-level description: {e}")
+                logger.warning("Could not update model-level description: %s", e)
 
         except Exception as e:
-            logger.warning(f"Could not update model descriptions: {e}")
+            logger.warning("Could not update model descriptions: %s", e)
+
+        # Make sure the queued params/metrics landed before the run is closed
+        mlflow.flush_async_logging()
 
         logger.info(
-            f"Model version saved to MLflow as '{MODEL_NAME}' with descriptions"
+            "Model version saved to MLflow as '%s' with descriptions", MODEL_NAME
         )
 
 
-def save_local_artifacts(model, scaler):
+def save_local_artifacts(model):
     """Save model artifacts locally for SageMaker"""
-    logger.info(f"Saving artifacts to {MODEL_DIR}")
+    logger.info("Saving artifacts to %s", MODEL_DIR)
 
     try:
         # Ensure directory exists with proper permissions
         os.makedirs(MODEL_DIR, mode=0o755, exist_ok=True)
 
-        # Save model and scaler
+        # Save model
         joblib.dump(model, os.path.join(MODEL_DIR, "model.joblib"))
-        joblib.dump(scaler, os.path.join(MODEL_DIR, "scaler.joblib"))
 
         logger.info("Local artifacts saved")
     except PermissionError as e:
-        logger.warning(f"Permission denied saving to {MODEL_DIR}: {e}")
+        logger.warning("Permission denied saving to %s: %s", MODEL_DIR, e)
         # Try alternative output location
         alt_dir = "/tmp/model_output"
-        logger.info(f"Trying alternative location: {alt_dir}")
+        logger.info("Trying alternative location: %s", alt_dir)
         os.makedirs(alt_dir, mode=0o755, exist_ok=True)
         joblib.dump(model, os.path.join(alt_dir, "model.joblib"))
-        joblib.dump(scaler, os.path.join(alt_dir, "scaler.joblib"))
-        logger.info(f"Artifacts saved to alternative location: {alt_dir}")
+        logger.info("Artifacts saved to alternative location: %s", alt_dir)
     except Exception as e:
-        logger.error(f"Failed to save local artifacts: {e}")
+        logger.error("Failed to save local artifacts: %s", e)
         # Don't fail the entire training job for local artifact saving
         logger.warning("Continuing training without local artifacts")
 
@@ -339,21 +455,28 @@ def main():
         X, y, class_names = load_iris_data()
 
         # Train model
-        model, scaler, accuracy = train_model(X, y)
+        model, accuracy = train_model(X, y)
 
-        # Save to MLflow if available
-        if mlflow_available:
-            save_to_mlflow(model, scaler, accuracy, class_names)
-        else:
-            logger.warning("Skipping MLflow logging - no tracking server available")
+        # Save local artifacts while the MLflow upload (if any) is in flight;
+        # both only read the trained model
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(save_local_artifacts, model)]
+
+            # Save to MLflow if available
+            if mlflow_available:
+                futures.append(
+                    executor.submit(save_to_mlflow, model, accuracy, class_names)
+                )
+            else:
+                logger.warning("Skipping MLflow logging - no tracking server available")
 
-        # Save local artifacts
-        save_local_artifacts(model, scaler)
+            for future in futures:
+                future.result()
 
         logger.info("Training completed successfully!")
 
     except Exception as e:
-        logger.error(f"Training failed: {e}")
+        logger.error("Training failed: %s", e)
         raise
 
 
@@ -4,27 +4,25 @@ Task automation for SageMaker Pipelines development workflow
 Provides common development tasks for building, testing, and deploying ML pipelines
 """
 
+import os
 import sys
 import subprocess
 import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 
 def run_command(
     cmd: List[str], cwd: Optional[str] = None, check: bool = True
 ) -> subprocess.CompletedProcess:
-    """Run a command with proper error handling"""
+    """Run a command with proper error handling, streaming its output"""
     print(f"Running: {' '.join(cmd)}")
     if cwd:
         print(f"Working directory: {cwd}")
 
-    result = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True, check=False)
-
-    if result.stdout:
-        print(result.stdout)
-    if result.stderr:
-        print(result.stderr, file=sys.stderr)
+    result = subprocess.run(cmd, cwd=cwd, check=False)
 
     if check and result.returncode != 0:
         sys.exit(result.returncode)
@@ -32,6 +30,53 @@ def run_command(
     return result
 
 
+def run_commands_parallel(
+    jobs: List[Tuple[List[List[str]], str]], check: bool = False
+) -> None:
+    """Run each job's commands in order, with the jobs themselves in parallel
+
+    Each job is a (commands, cwd) pair. Output streams as it arrives, with
+    every line prefixed by the job's directory name (e.g. [training]) so the
+    jobs can be told apart. With check set, a job stops at its first failing
+    command and the task exits with that command's return code once all jobs
+    have finished.
+    """
+    print_lock = threading.Lock()
+
+    def emit(prefix: str, line: str) -> None:
+        with print_lock:
+            print(f"{prefix} {line}", flush=True)
+
+    def run_job(commands: List[List[str]], cwd: str) -> int:
+        prefix = f"[{Path(cwd).name}]"
+        returncode = 0
+        for cmd in commands:
+            emit(prefix, f"Running: {' '.join(cmd)}")
+            with subprocess.Popen(
+                cmd,
+                cwd=cwd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+            ) as proc:
+                for line in proc.stdout:
+                    emit(prefix, line.rstrip("\n"))
+            returncode = returncode or proc.returncode
+            if check and proc.returncode != 0:
+                break
+        return returncode
+
+    # Each worker thread runs one job and reads its output
+    with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+        futures = [executor.submit(run_job, commands, cwd) for commands, cwd in jobs]
+        returncodes = [future.result() for future in futures]
+
+    failed = next((code for code in returncodes if code), 0)
+    if check and failed:
+        sys.exit(failed)
+
+
 def setup_project():
     """Setup the project by installing dependencies and creating lock files"""
     print("Setting up project dependencies...")
@@ -51,17 +96,18 @@ def lint_code():
     """Run linting on all Python code"""
     print("Running code linting...")
 
-    # Training code
-    print("\nLinting training code...")
-    run_command(["uv", "run", "black", "app/"], cwd="src/training", check=False)
-    run_command(["uv", "run", "isort", "app/"], cwd="src/training", check=False)
-    run_command(["uv", "run", "flake8", "app/"], cwd="src/training", check=False)
-
-    # Inference code
-    print("\nLinting inference code...")
-    run_command(["uv", "run", "black", "app/"], cwd="src/inference", check=False)
-    run_command(["uv", "run", "isort", "app/"], cwd="src/inference", check=False)
-    run_command(["uv", "run", "flake8", "app/"], cwd="src/inference", check=False)
+    # black and isort both rewrite files, so the tools run in order within a
+    # service while the training and inference code are linted side by side
+    lint_commands = [
+        ["uv", "run", "black", "app/"],
+        ["uv", "run", "isort", "app/"],
+        ["uv", "run", "flake8", "app/"],
+    ]
+
+    print("\nLinting training and inference code...")
+    run_commands_parallel(
+        [(lint_commands, "src/training"), (lint_commands, "src/inference")]
+    )
 
     print("Code linting complete!")
 
@@ -70,16 +116,12 @@ def test_code():
     """Run tests for the applications"""
     print("Running tests...")
 
-    # Training tests
-    print("\nTesting training code...")
-    run_command(
-        ["uv", "run", "pytest", "tests/", "-v"], cwd="src/training", check=False
-    )
+    # Training and inference test suites are independent, so run them together
+    test_commands = [["uv", "run", "pytest", "tests/", "-v"]]
 
-    # Inference tests
-    print("\nTesting inference code...")
-    run_command(
-        ["uv", "run", "pytest", "tests/", "-v"], cwd="src/inference", check=False
+    print("\nTesting training and inference code...")
+    run_commands_parallel(
+        [(test_commands, "src/training"), (test_commands, "src/inference")]
     )
 
     print("Tests complete!")
@@ -90,16 +132,23 @@ def build_images(service: Optional[str] = None):
     print("Building Docker images...")
 
     services = ["training", "inference"] if service is None else [service]
+    image_tags = [f"ml-platform-{svc}:dev" for svc in services]
 
-    for svc in services:
-        print(f"\nBuilding {svc} image...")
-        image_tag = f"ml-platform-{svc}:dev"
-
-        run_command(
-            ["docker", "build", "-t", image_tag, "-f", "Dockerfile", "."],
-            cwd=f"src/{svc}",
-        )
+    # The images share nothing, so build them concurrently with BuildKit
+    os.environ.setdefault("DOCKER_BUILDKIT", "1")
+    print(f"\nBuilding {', '.join(services)} image(s)...")
+    run_commands_parallel(
+        [
+            (
+                [["docker", "build", "-t", image_tag, "-f", "Dockerfile", "."]],
+                f"src/{svc}",
+            )
+            for svc, image_tag in zip(services, image_tags)
+        ],
+        check=True,
+    )
 
+    for image_tag in image_tags:
         print(f"Built {image_tag}")
 
     print("Docker images built successfully!")
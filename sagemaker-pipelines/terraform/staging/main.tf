@@ -57,9 +57,10 @@ locals {
   training_image_uri  = "${data.aws_caller_identity.current.account_id}.dkr.ecr.${local.aws_region}.amazonaws.com/ml-platform-staging-training:latest"
   inference_image_uri = "${data.aws_caller_identity.current.account_id}.dkr.ecr.${local.aws_region}.amazonaws.com/ml-platform-staging-inference:latest"
   
-  # MLflow Configuration - discovered at runtime
-  mlflow_tracking_uri = ""  # Will be discovered dynamically in the container
+  # MLflow Configuration - the tracking server ARN is deterministic, so bake it
+  # into the container environment and skip the describe call at startup
   mlflow_tracking_server_name = "mlflow-staging-mlflow"
+  mlflow_tracking_uri = "arn:aws:sagemaker:${local.aws_region}:${data.aws_caller_identity.current.account_id}:mlflow-tracking-server/${local.mlflow_tracking_server_name}"
   
   # Scheduling Configuration
   enable_training_schedule  = true
@@ -75,8 +76,8 @@ data "aws_s3_bucket" "ml_bucket" {
   bucket = local.s3_bucket_name
 }
 
-# Get MLflow tracking server dynamically using AWS CLI in the container
-# The training script will discover the MLflow server at runtime
+# The containers fall back to discovering the MLflow server by name at runtime
+# when MLFLOW_TRACKING_URI is empty
 
 # Call the SageMaker Pipelines module
 module "sagemaker_pipelines" {
@@ -72,8 +72,8 @@ output "inference_image_uri" {
 
 # MLflow Configuration
 output "mlflow_tracking_uri" {
-  description = "MLflow tracking server URI (discovered dynamically at runtime)"
-  value       = "Discovered automatically by training script using AWS SageMaker API"
+  description = "MLflow tracking server ARN passed to the containers as MLFLOW_TRACKING_URI"
+  value       = local.mlflow_tracking_uri
 }
 
 # Quick Start Commands